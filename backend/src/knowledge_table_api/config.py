@@ -14,6 +14,7 @@ class Settings(BaseSettings):
     dimensions: int = 768
     embedding_provider: str = "openai"
     llm_provider: str = "openai"
+    llm_max_concurrency: int = 8
     openai_api_key: str
 
     # VECTOR DATABASE CONFIG
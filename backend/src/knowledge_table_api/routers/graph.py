@@ -32,9 +32,7 @@ class CustomJSONEncoder(json.JSONEncoder):
 
     def default(self, obj: Any) -> Any:
         """Handle various types for JSON encoding, such as datetime, Decimal, Chunk, and ChunkMetadata."""
-        if isinstance(obj, bool):
-            return str(obj).lower()
-        elif isinstance(obj, (datetime, date)):
+        if isinstance(obj, (datetime, date)):
             return obj.isoformat()
         elif isinstance(obj, Decimal):
             return float(obj)
@@ -1,80 +1,349 @@
 """JSON Encoder."""
 
+import base64
 import json
+import re
+import uuid
 from datetime import date, datetime
 from decimal import Decimal
-from typing import Any, Dict
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    FrozenSet,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import numpy as np
+import numpy.typing as npt
+import orjson
 from whyhow import Chunk, ChunkMetadata
 
+# Natively serializable types that need no conversion in default
+_ATOMIC_TYPES = frozenset({str, int, float, bool, type(None)})
+
+# Float vectors at least this long are shipped as base64 instead of lists
+_NDARRAY_BINARY_MIN_SIZE = 64
+_NDARRAY_BINARY_DTYPES = frozenset(
+    {np.dtype(np.float32), np.dtype(np.float64)}
+)
+
+
+class RawJSON:
+    """A pre-encoded JSON fragment that CustomJSONEncoder emits verbatim."""
+
+    __slots__ = ("s",)
+
+    def __init__(self, s: str) -> None:
+        self.s = s
+
+
+# Pre-encoded chunks keyed by (chunk_id, updated_at), oldest evicted first
+_CHUNK_CACHE_MAX_SIZE = 1024
+_chunk_cache: Dict[Tuple[Any, Any], RawJSON] = {}
+
 
 class CustomJSONEncoder(json.JSONEncoder):
     """Custom JSON encoder that handles a variety of data types."""
 
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Initialize the encoder and its RawJSON placeholder state."""
+        super().__init__(*args, **kwargs)
+        self._raw_nonce = uuid.uuid4().hex
+        self._raw_fragments: List[str] = []
+
+    def iterencode(self, o: Any, _one_shot: bool = False) -> Iterator[str]:
+        """Encode the given object, splicing in RawJSON fragments verbatim."""
+        # Fragments are only known once encoding has run, so splice at the end
+        self._raw_fragments = []
+        encoded = "".join(super().iterencode(o, _one_shot))
+        if self._raw_fragments:
+            fragments = self._raw_fragments
+            encoded = re.sub(
+                rf'"{self._raw_nonce}:(\d+)"',
+                lambda match: fragments[int(match.group(1))],
+                encoded,
+            )
+        yield encoded
+
     def default(self, obj: Any) -> Any:
         """Override the default JSON encoding behavior to handle additional data types."""
-        if isinstance(obj, bool):
-            return str(obj).lower()
-        elif isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        elif isinstance(obj, Decimal):
-            return float(obj)
-        elif isinstance(obj, (set, frozenset)):
-            return list(obj)
-        elif isinstance(obj, Chunk):
-            return self.encode_chunk(obj)
-        elif isinstance(obj, ChunkMetadata):
-            return self.encode_chunk_metadata(obj)
+        if type(obj) in _ATOMIC_TYPES:
+            return obj
+
+        # Exact type match first, subclasses fall through to isinstance
+        encoder = _ENCODERS.get(type(obj))
+        if encoder is not None:
+            return encoder(obj, self)
+
+        # Ordered by how often each type shows up in our payloads
+        if isinstance(obj, (datetime, date)):
+            return _enc_datetime(obj, self)
         elif isinstance(obj, np.ndarray):
-            return obj.tolist()
+            return _enc_ndarray(obj, self)
         elif isinstance(obj, np.integer):
-            return int(obj)
+            return _enc_np_integer(obj, self)
         elif isinstance(obj, np.floating):
-            return float(obj)
-        elif hasattr(obj, "to_dict"):
-            return obj.to_dict()
-        elif hasattr(obj, "__dict__"):
-            return {
-                key: self.default(value) for key, value in obj.__dict__.items()
-            }
+            return _enc_np_floating(obj, self)
+        elif isinstance(obj, Decimal):
+            return _enc_decimal(obj, self)
+        elif isinstance(obj, (set, frozenset)):
+            return _enc_set(obj, self)
+        elif isinstance(obj, RawJSON):
+            return _enc_raw_json(obj, self)
+
+        # Probe the class, so instance __getattr__ hooks are never triggered
+        to_dict = getattr(type(obj), "to_dict", None)
+        if to_dict is not None:
+            return to_dict(obj)
+        # Let the encoder recurse, so only unknown values reach default
+        attributes = getattr(obj, "__dict__", None)
+        if attributes is not None:
+            return attributes
         try:
             return super().default(obj)
         except TypeError:
             return str(obj)
 
-    def encode_chunk(self, chunk: Chunk) -> Dict[str, Any]:
-        """Encode a Chunk object into a JSON-serializable dictionary."""
-        return {
-            "chunk_id": chunk.chunk_id,
-            "created_at": (
-                chunk.created_at.isoformat() if chunk.created_at else None
-            ),
-            "updated_at": (
-                chunk.updated_at.isoformat() if chunk.updated_at else None
-            ),
-            "document_id": chunk.document_id,
-            "workspace_ids": chunk.workspace_ids,
-            "metadata": (
-                self.encode_chunk_metadata(chunk.metadata)
-                if chunk.metadata
-                else None
-            ),
-            "content": chunk.content,
-            "embedding": self.default(chunk.embedding),
-            "tags": chunk.tags,
-            "user_metadata": chunk.user_metadata,
-        }
-
-    def encode_chunk_metadata(self, metadata: ChunkMetadata) -> Dict[str, Any]:
-        """Encode ChunkMetadata object into a JSON-serializable dictionary."""
-        return {
-            "language": metadata.language,
-            "length": metadata.length,
-            "size": metadata.size,
-            "data_source_type": metadata.data_source_type,
-            "index": metadata.index,
-            "page": metadata.page,
-            "start": metadata.start,
-            "end": metadata.end,
-        }
+    def encode_chunks(self, chunks: List[Chunk]) -> List[Dict[str, Any]]:
+        """Encode a list of Chunk objects, converting embeddings in one batch."""
+        embeddings = _encode_embeddings([chunk.embedding for chunk in chunks])
+        return [
+            _chunk_fields(chunk, embedding)
+            for chunk, embedding in zip(chunks, embeddings)
+        ]
+
+
+def _chunk_to_dict(self: Chunk) -> Dict[str, Any]:
+    """Convert the Chunk object into a JSON-serializable dictionary."""
+    return _chunk_fields(self, _chunk_embedding(self))
+
+
+def _chunk_metadata_to_dict(self: ChunkMetadata) -> Dict[str, Any]:
+    """Convert the ChunkMetadata object into a JSON-serializable dictionary."""
+    # Faster than model_dump(include=...) or a getattr loop over a
+    # field tuple, and limits output to these fields if whyhow adds more
+    return {
+        "language": self.language,
+        "length": self.length,
+        "size": self.size,
+        "data_source_type": self.data_source_type,
+        "index": self.index,
+        "page": self.page,
+        "start": self.start,
+        "end": self.end,
+    }
+
+
+# Chunk and ChunkMetadata come from whyhow, so attach to_dict at import
+Chunk.to_dict = _chunk_to_dict
+ChunkMetadata.to_dict = _chunk_metadata_to_dict
+
+
+def _chunk_fields(chunk: Chunk, embedding: Any) -> Dict[str, Any]:
+    return {
+        "chunk_id": chunk.chunk_id,
+        "created_at": (
+            chunk.created_at.isoformat() if chunk.created_at else None
+        ),
+        "updated_at": (
+            chunk.updated_at.isoformat() if chunk.updated_at else None
+        ),
+        "document_id": chunk.document_id,
+        "workspace_ids": chunk.workspace_ids,
+        "metadata": chunk.metadata.to_dict() if chunk.metadata else None,
+        "content": chunk.content,
+        "embedding": embedding,
+        "tags": chunk.tags,
+        "user_metadata": chunk.user_metadata,
+    }
+
+
+def _encode_ndarray(arr: npt.NDArray[Any]) -> Any:
+    """Encode an ndarray, packing float vectors such as embeddings as base64.
+
+    Small, multi-dimensional and non-float arrays are returned as nested
+    lists. Packed arrays decode with ``np.frombuffer(base64.b64decode(
+    data["__ndarray__"]), dtype=data["dtype"]).reshape(data["shape"])``.
+    """
+    if arr.ndim == 1 and _is_binary_vector(arr):
+        return _pack_ndarray(arr.tobytes(), arr)
+    return arr.tolist()
+
+
+def _encode_embedding(embedding: Any) -> Any:
+    if isinstance(embedding, np.ndarray):
+        return _encode_ndarray(embedding)
+    return embedding
+
+
+def _chunk_embedding(chunk: Chunk) -> Any:
+    """Encode a chunk's embedding, keeping small ones on the chunk as a list.
+
+    The list is stored as ``chunk._embedding_list`` together with the array
+    it came from, so it is rebuilt if the embedding is replaced.
+    """
+    embedding = chunk.embedding
+    if not isinstance(embedding, np.ndarray) or (
+        embedding.ndim == 1 and _is_binary_vector(embedding)
+    ):
+        return _encode_embedding(embedding)
+
+    cached = getattr(chunk, "_embedding_list", None)
+    if cached is None or cached[0] is not embedding:
+        cached = (embedding, embedding.tolist())
+        # Bypass model validation, this is a cache and not a field
+        object.__setattr__(chunk, "_embedding_list", cached)
+    return cached[1]
+
+
+def _encode_embeddings(embeddings: List[Any]) -> List[Any]:
+    """Encode embeddings, stacking them into one array when they line up.
+
+    A single ``tolist()`` or ``tobytes()`` over the stacked 2-D array
+    replaces one conversion per embedding. Mixed shapes, dtypes or
+    non-ndarray values are encoded one by one.
+    """
+    first = embeddings[0] if embeddings else None
+    if not (
+        isinstance(first, np.ndarray)
+        and first.ndim == 1
+        and all(
+            isinstance(embedding, np.ndarray)
+            and embedding.shape == first.shape
+            and embedding.dtype == first.dtype
+            for embedding in embeddings
+        )
+    ):
+        return [_encode_embedding(embedding) for embedding in embeddings]
+
+    stacked = np.stack(embeddings)
+    if not _is_binary_vector(first):
+        return stacked.tolist()
+
+    data = memoryview(stacked.tobytes())
+    step = first.nbytes
+    return [
+        _pack_ndarray(data[offset : offset + step], first)
+        for offset in range(0, len(data), step)
+    ]
+
+
+def _is_binary_vector(arr: npt.NDArray[Any]) -> bool:
+    return (
+        arr.size >= _NDARRAY_BINARY_MIN_SIZE
+        and arr.dtype in _NDARRAY_BINARY_DTYPES
+    )
+
+
+def _pack_ndarray(data: Any, like: npt.NDArray[Any]) -> Dict[str, Any]:
+    return {
+        "__ndarray__": base64.b64encode(data).decode(),
+        "dtype": str(like.dtype),
+        "shape": like.shape,
+    }
+
+
+def _enc_datetime(obj: Union[datetime, date], _: CustomJSONEncoder) -> str:
+    return obj.isoformat()
+
+
+def _enc_raw_json(obj: RawJSON, encoder: CustomJSONEncoder) -> str:
+    # Stand in a placeholder string that iterencode swaps for the fragment
+    encoder._raw_fragments.append(obj.s)
+    return f"{encoder._raw_nonce}:{len(encoder._raw_fragments) - 1}"
+
+
+def _enc_chunk(obj: Chunk, encoder: CustomJSONEncoder) -> Any:
+    raw = _cached_chunk(obj)
+    if raw is None:
+        return obj.to_dict()
+    return _enc_raw_json(raw, encoder)
+
+
+def _cached_chunk(chunk: Chunk) -> Optional[RawJSON]:
+    # Only chunks carrying both parts of the key can be told apart
+    if chunk.chunk_id is None or chunk.updated_at is None:
+        return None
+
+    key = (chunk.chunk_id, chunk.updated_at)
+    raw = _chunk_cache.get(key)
+    if raw is None:
+        raw = RawJSON(json.dumps(chunk.to_dict(), cls=CustomJSONEncoder))
+        if len(_chunk_cache) >= _CHUNK_CACHE_MAX_SIZE:
+            _chunk_cache.pop(next(iter(_chunk_cache)), None)
+        _chunk_cache[key] = raw
+    return raw
+
+
+def _enc_to_dict(obj: Any, _: CustomJSONEncoder) -> Any:
+    return obj.to_dict()
+
+
+def _enc_ndarray(obj: npt.NDArray[Any], _: CustomJSONEncoder) -> Any:
+    return _encode_ndarray(obj)
+
+
+def _enc_np_integer(obj: np.integer[Any], _: CustomJSONEncoder) -> int:
+    return int(obj)
+
+
+def _enc_np_floating(obj: np.floating[Any], _: CustomJSONEncoder) -> float:
+    return float(obj)
+
+
+def _enc_decimal(obj: Decimal, _: CustomJSONEncoder) -> float:
+    return float(obj)
+
+
+def _enc_set(
+    obj: Union[Set[Any], FrozenSet[Any]], _: CustomJSONEncoder
+) -> List[Any]:
+    return list(obj)
+
+
+# Exact-type dispatch table consulted before the isinstance fallback
+_ENCODERS: Dict[type, Callable[[Any, CustomJSONEncoder], Any]] = {
+    datetime: _enc_datetime,
+    date: _enc_datetime,
+    Chunk: _enc_chunk,
+    ChunkMetadata: _enc_to_dict,
+    np.ndarray: _enc_ndarray,
+    np.float32: _enc_np_floating,
+    np.float64: _enc_np_floating,
+    np.int32: _enc_np_integer,
+    np.int64: _enc_np_integer,
+    Decimal: _enc_decimal,
+    set: _enc_set,
+    frozenset: _enc_set,
+    RawJSON: _enc_raw_json,
+}
+
+
+_fallback_encoder = CustomJSONEncoder()
+
+
+def _fallback_default(obj: Any) -> Any:
+    # orjson handles datetime and numpy natively, everything else lands here
+    if isinstance(obj, RawJSON):
+        return orjson.Fragment(obj.s)
+    elif isinstance(obj, Chunk):
+        raw = _cached_chunk(obj)
+        if raw is None:
+            return obj.to_dict()
+        return orjson.Fragment(raw.s)
+    return _fallback_encoder.default(obj)
+
+
+def dumps(obj: Any) -> str:
+    """Serialize an object to a compact JSON string using orjson."""
+    return orjson.dumps(
+        obj,
+        default=_fallback_default,
+        option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS,
+    ).decode()
@@ -1,8 +1,12 @@
 """The functions for generating responses from the language model."""
 
-import json
+import hashlib
 import logging
-from typing import Any, List, Literal, Type, Union
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, List, Literal, Tuple, Type, Union
+
+from pydantic import BaseModel
 
 from knowledge_table_api.models.graph import Table
 from knowledge_table_api.models.llm_response import (
@@ -16,9 +20,9 @@ from knowledge_table_api.models.llm_response import (
     SubQueriesResponseModel,
 )
 from knowledge_table_api.models.query import Rule
+from knowledge_table_api.services.json_encoder import dumps
 from knowledge_table_api.services.llm_service import LLMService
 from knowledge_table_api.services.prompts import (
-    BASE_PROMPT,
     BOOL_INSTRUCTIONS,
     DECOMPOSE_QUERY_PROMPT,
     INT_ARRAY_INSTRUCTIONS,
@@ -26,11 +30,19 @@ from knowledge_table_api.services.prompts import (
     SCHEMA_PROMPT,
     SIMILAR_KEYWORDS_PROMPT,
     STR_ARRAY_INSTRUCTIONS,
+    format_base_prompt,
 )
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Hashable stand-in for a must_return / may_return rule: (type, options)
+StrRuleKey = Tuple[str, Tuple[str, ...]]
+
+# LRU of parsed responses keyed by prompt hash and response model name
+_RESPONSE_CACHE_MAX_SIZE = 512
+_response_cache: OrderedDict[str, BaseModel] = OrderedDict()
+
 
 async def generate_response(
     llm_service: LLMService,
@@ -61,33 +73,36 @@ async def generate_response(
         (rule for rule in rules if rule.type == "max_length"), None
     )
 
-    format_specific_instructions = ""
+    str_rule_key: StrRuleKey | None = (
+        (str_rule.type, tuple(str_rule.options))
+        if str_rule and str_rule.options
+        else None
+    )
+    int_rule_key = int_rule.length if int_rule else None
+    # Only may_return rules quote the query, keep it out of the key otherwise
+    rule_query = (
+        query if str_rule_key and str_rule_key[0] == "may_return" else ""
+    )
+    format_specific_instructions = _format_instructions(
+        format, str_rule_key, int_rule_key, rule_query
+    )
+
     if format == "bool":
-        format_specific_instructions = BOOL_INSTRUCTIONS
         output_model = BoolResponseModel
     elif format in ["str_array", "str"]:
-        str_rule_line = _get_str_rule_line(str_rule, query)
-        int_rule_line = _get_int_rule_line(int_rule)
-        format_specific_instructions = STR_ARRAY_INSTRUCTIONS.substitute(
-            str_rule_line=str_rule_line, int_rule_line=int_rule_line
-        )
         output_model = (
             StrArrayResponseModel
             if format == "str_array"
             else StrResponseModel
         )
     elif format in ["int", "int_array"]:
-        int_rule_line = _get_int_rule_line(int_rule)
-        format_specific_instructions = INT_ARRAY_INSTRUCTIONS.substitute(
-            int_rule_line=int_rule_line
-        )
         output_model = (
             IntArrayResponseModel
             if format == "int_array"
             else IntResponseModel
         )
 
-    prompt = BASE_PROMPT.substitute(
+    prompt = format_base_prompt(
         query=query,
         chunks=chunks,
         format_specific_instructions=format_specific_instructions,
@@ -118,8 +133,8 @@ async def get_keywords(
     prompt = KEYWORD_PROMPT.substitute(query=query)
 
     try:
-        response = await llm_service.generate_completion(
-            prompt, KeywordsResponseModel
+        response = await _cached_completion(
+            llm_service, prompt, KeywordsResponseModel
         )
         keywords = response.keywords
         return {
@@ -144,8 +159,8 @@ async def get_similar_keywords(
     )
 
     try:
-        response = await llm_service.generate_completion(
-            prompt, KeywordsResponseModel
+        response = await _cached_completion(
+            llm_service, prompt, KeywordsResponseModel
         )
         keywords = response.keywords
         return {
@@ -165,8 +180,8 @@ async def decompose_query(
     prompt = DECOMPOSE_QUERY_PROMPT.substitute(query=query)
 
     try:
-        response = await llm_service.generate_completion(
-            prompt, SubQueriesResponseModel
+        response = await _cached_completion(
+            llm_service, prompt, SubQueriesResponseModel
         )
         sub_queries = response.sub_queries
         return {
@@ -187,38 +202,31 @@ async def generate_schema(
     """Generate a schema for the table based on column information and questions."""
     logger.info("Generating schema.")
 
-    # Ensure documents is a list of strings
-    documents: List[str] = list(
-        set(str(row.document.name) for row in data.rows)
+    # Ensure documents is a list of unique strings, sorted for a stable prompt
+    documents: List[str] = sorted(
+        {str(row.document.name) for row in data.rows}
     )
 
-    prepared_data = {
-        "documents": documents,
-        "columns": [
+    # Build the prompt columns and their entity types in a single pass
+    columns: List[dict[str, Any]] = []
+    entity_types: List[str] = []
+    for column in data.columns:
+        entity_type = column.prompt.entityType
+        entity_types.append(entity_type)
+        columns.append(
             {
                 "id": column.id,
-                "entity_type": column.prompt.entityType,
+                "entity_type": entity_type,
                 "type": column.prompt.type,
                 "question": column.prompt.query,
             }
-            for column in data.columns
-        ],
-    }
-
-    # Ensure prepared_data["columns"] is a list
-    if not isinstance(prepared_data["columns"], list):
-        logger.error("prepared_data['columns'] is not a list")
-        return {"schema": None}
-
-    entity_types: List[str] = [
-        column["entity_type"] for column in prepared_data["columns"]
-    ]
+        )
 
     # Ensure we're joining a list of strings
     prompt = SCHEMA_PROMPT.substitute(
         documents=", ".join(documents) if documents else "",
         entity_types=", ".join(entity_types) if entity_types else "",
-        columns=json.dumps(prepared_data["columns"]),
+        columns=dumps(columns),
     )
 
     try:
@@ -232,20 +240,74 @@ async def generate_schema(
         return {"schema": None}
 
 
-def _get_str_rule_line(str_rule: Rule | None, query: str) -> str:
+async def _cached_completion(
+    llm_service: LLMService, prompt: str, response_model: Type[BaseModel]
+) -> Any:
+    """Generate a completion, reusing the response to an identical prompt."""
+    key = (
+        hashlib.sha256(prompt.encode()).hexdigest()
+        + ":"
+        + response_model.__name__
+    )
+    cached = _response_cache.get(key)
+    if cached is not None:
+        _response_cache.move_to_end(key)
+        return cached.model_copy(deep=True)
+
+    response = await llm_service.generate_completion(prompt, response_model)
+    _response_cache[key] = response.model_copy(deep=True)
+    if len(_response_cache) > _RESPONSE_CACHE_MAX_SIZE:
+        _response_cache.popitem(last=False)
+    return response
+
+
+@lru_cache(maxsize=256)
+def _format_instructions(
+    format: str,
+    str_rule_key: StrRuleKey | None,
+    int_rule_key: int | None,
+    query: str,
+) -> str:
+    if format == "bool":
+        return BOOL_INSTRUCTIONS
+    elif format in ["str_array", "str"]:
+        return STR_ARRAY_INSTRUCTIONS.substitute(
+            str_rule_line=_get_str_rule_line(str_rule_key, query),
+            int_rule_line=_get_int_rule_line(int_rule_key),
+        )
+    elif format in ["int", "int_array"]:
+        return INT_ARRAY_INSTRUCTIONS.substitute(
+            int_rule_line=_get_int_rule_line(int_rule_key)
+        )
+    return ""
+
+
+def _get_str_rule_line(str_rule: StrRuleKey | None, query: str) -> str:
     if str_rule:
-        if str_rule.type == "must_return" and str_rule.options:
-            options_str = ", ".join(
-                f'"{option}"' for option in str_rule.options
-            )
-            return f"You should only consider these possible values when answering the question: {options_str}. If these values do not exist in the raw text chunks, or if they do not correctly answer the question, respond with None."
-        elif str_rule.type == "may_return" and str_rule.options:
-            options_str = ", ".join(str_rule.options)
-            return f"For example: Query: {query} Response: {options_str}, etc... If you cannot find a related, correct answer in the raw text chunks, respond with None."
+        rule_type, options = str_rule
+        formatter = _STR_RULE_FORMATTERS.get(rule_type)
+        if formatter and options:
+            return formatter(options, query)
     return ""
 
 
-def _get_int_rule_line(int_rule: Rule | None) -> str:
-    if int_rule and int_rule.length is not None:
-        return f"Your answer should only return up to {int_rule.length} items. If you have to choose between multiple, return those that answer the question the best. If you cannot find any suitable answer, respond with None."
+def _must_return_line(options: Tuple[str, ...], query: str) -> str:
+    options_str = ", ".join(f'"{option}"' for option in options)
+    return f"You should only consider these possible values when answering the question: {options_str}. If these values do not exist in the raw text chunks, or if they do not correctly answer the question, respond with None."
+
+
+def _may_return_line(options: Tuple[str, ...], query: str) -> str:
+    options_str = ", ".join(options)
+    return f"For example: Query: {query} Response: {options_str}, etc... If you cannot find a related, correct answer in the raw text chunks, respond with None."
+
+
+_STR_RULE_FORMATTERS: dict[str, Callable[[Tuple[str, ...], str], str]] = {
+    "must_return": _must_return_line,
+    "may_return": _may_return_line,
+}
+
+
+def _get_int_rule_line(length: int | None) -> str:
+    if length is not None:
+        return f"Your answer should only return up to {length} items. If you have to choose between multiple, return those that answer the question the best. If you cannot find any suitable answer, respond with None."
     return ""
@@ -1,5 +1,6 @@
 """The service for the language model."""
 
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Any, Optional
 
@@ -7,6 +8,9 @@ import instructor
 
 from knowledge_table_api.config import settings
 
+# Shared by all service instances to stay within the provider's rate limits
+_completion_semaphore = asyncio.Semaphore(settings.llm_max_concurrency)
+
 
 class LLMService(ABC):
     """Abstract base class for language model services."""
@@ -29,9 +33,9 @@ class OpenAIService(LLMService):
 
     def __init__(self) -> None:
         from langchain_openai import OpenAIEmbeddings
-        from openai import OpenAI
+        from openai import AsyncOpenAI
 
-        openai_client = OpenAI(api_key=settings.openai_api_key)
+        openai_client = AsyncOpenAI(api_key=settings.openai_api_key)
         self.client = instructor.from_openai(openai_client)
         self.embeddings = OpenAIEmbeddings(
             model="text-embedding-3-small",
@@ -42,11 +46,12 @@ class OpenAIService(LLMService):
         self, prompt: str, response_model: Any, model: str = "gpt-4o"
     ) -> Any:
         """Generate a completion from the language model."""
-        response = self.client.chat.completions.create(
-            model=model,
-            response_model=response_model,
-            messages=[{"role": "user", "content": prompt}],
-        )
+        async with _completion_semaphore:
+            response = await self.client.chat.completions.create(
+                model=model,
+                response_model=response_model,
+                messages=[{"role": "user", "content": prompt}],
+            )
         return response
 
     def get_embeddings(self) -> Any:
@@ -30,6 +30,19 @@ $format_specific_instructions
 """
 )
 
+# BASE_PROMPT is rendered for every cell, so keep a %-format copy of it
+_BASE_PROMPT_FORMAT = Template(
+    BASE_PROMPT.template.replace("%", "%%")
+).substitute(query="%s", chunks="%s", format_specific_instructions="%s")
+
+
+def format_base_prompt(
+    query: str, chunks: str, format_specific_instructions: str
+) -> str:
+    """Render BASE_PROMPT, equivalent to calling its substitute method."""
+    return _BASE_PROMPT_FORMAT % (query, chunks, format_specific_instructions)
+
+
 BOOL_INSTRUCTIONS = """
 **Special Instructions for Boolean Questions**:
 